@@ -0,0 +1,58 @@
+"""Parsing of the amount columns of large item tables, compared to the former regex based conversion.
+
+Run from the repository root: python -m benchmarks.bench_amounts
+"""
+import io
+import re
+from decimal import Decimal
+
+from benchmarks.common import generate_invoice, report
+from converter import parser
+from converter.parser import KrosParser, convert_decimal, convert_repeated_decimal
+from converter.tokenizer import KrosTokenizer
+
+WHITESPACE_RE = re.compile(r'\s', re.UNICODE)
+
+
+def convert_decimal_regex(value):
+    return Decimal(WHITESPACE_RE.sub('', value).replace(',', '.'))
+
+
+def distinct_amount(n: int) -> str:
+    """Amount like "12 345,67" with NBSP thousands separators, different for every n."""
+    return f'{n // 100:,}'.replace(',', '\xa0') + f',{n % 100:02d}'
+
+
+def main():
+    repeated_columns = [KrosParser.items_quantity_column, KrosParser.items_unit_price_column,
+                        KrosParser.items_vat_column]
+    total_columns = [KrosParser.items_total_no_vat_column, KrosParser.items_total_column]
+    for item_rows in (10_000, 100_000):
+        data = generate_invoice(item_rows)
+        rows = [row for row in KrosTokenizer(data, KrosParser.layout_columns)
+                if len(row) > KrosParser.items_total_column and row[0][:-1].isdigit()]
+        # generated invoices repeat the example rows, make the totals unique as they would be in a real export
+        for n, row in enumerate(rows):
+            row[KrosParser.items_total_no_vat_column] = distinct_amount(2 * n + 100_000)
+            row[KrosParser.items_total_column] = distinct_amount(2 * n + 100_001)
+        print(f'--- {len(rows):,} item rows, {len(rows) * 5:,} amounts')
+
+        def regex():
+            return [[convert_decimal_regex(row[column]) for column in repeated_columns + total_columns]
+                    for row in rows]
+
+        def optimized():
+            parser._amount_cache.clear()
+            return [[convert_repeated_decimal(row[column]) for column in repeated_columns] +
+                    [convert_decimal(row[column]) for column in total_columns] for row in rows]
+
+        assert regex() == optimized()
+        baseline = report('regex substitution + Decimal', regex, len(rows))
+        fast = report('convert_decimal + cached repeated columns', optimized, len(rows))
+        print(f'{"speedup":<40} {baseline / fast:10.2f}x')
+        raw_data = data.encode('windows-1250')
+        report('KrosParser.parse (whole invoice)', lambda: KrosParser(io.BytesIO(raw_data)).parse(), len(rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""Encoding detection and decoding of large Windows 1250 exports, compared to decoding by trial.
+
+Run from the repository root: python -m benchmarks.bench_encoding
+"""
+from benchmarks.common import generate_invoice, report
+from converter.encoding import detect_encoding
+
+
+def decode_by_trial(raw_data: bytes) -> str:
+    for encoding in ['utf-8-sig', 'utf-8', 'windows-1250']:
+        try:
+            return raw_data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+
+
+def decode_detected(raw_data: bytes) -> str:
+    return raw_data.decode(detect_encoding(raw_data))
+
+
+def main():
+    for item_rows in (10_000, 100_000, 500_000):
+        raw_data = generate_invoice(item_rows).encode('windows-1250')
+        rows = raw_data.count(b'\n') + 1
+        assert decode_by_trial(raw_data) == decode_detected(raw_data)
+        print(f'--- {item_rows:,} item rows, {len(raw_data) / 1e6:.1f} MB')
+        baseline = report('utf-8-sig, utf-8, windows-1250 by trial', lambda: decode_by_trial(raw_data), rows)
+        optimized = report('detect_encoding + single decode', lambda: decode_detected(raw_data), rows)
+        print(f'{"speedup":<40} {baseline / optimized:10.2f}x')
+
+
+if __name__ == '__main__':
+    main()
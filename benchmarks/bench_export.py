@@ -0,0 +1,43 @@
+"""Pohoda XML export of a large invoice and of its corrected version, with and without the item fragment cache.
+
+Run from the repository root: python -m benchmarks.bench_export
+"""
+import dataclasses
+import io
+
+from benchmarks.common import generate_invoice, report
+from converter.export import PohodaExporter, CachedPohodaExporter
+from converter.parser import KrosParser
+
+
+def main():
+    for item_rows in (1_000, 10_000):
+        invoice = KrosParser(io.BytesIO(generate_invoice(item_rows).encode('windows-1250'))).parse()
+        # make every line unique, as in a real invoice, then correct every 20th line
+        invoice.items = [dataclasses.replace(item, name=f'{item.name} #{n}') for n, item in enumerate(invoice.items)]
+        corrected = dataclasses.replace(invoice, items=[
+            dataclasses.replace(item, quantity=item.quantity + 1) if n % 20 == 0 else item
+            for n, item in enumerate(invoice.items)
+        ])
+        print(f'--- {len(invoice.items):,} items, 5 % of them corrected')
+
+        def cold():
+            CachedPohodaExporter.fragment_cache.clear()
+            CachedPohodaExporter(invoice).export()
+
+        def warm():
+            CachedPohodaExporter.fragment_cache.clear()
+            CachedPohodaExporter(invoice).export()
+            return CachedPohodaExporter(corrected)
+
+        baseline = report('PohodaExporter', lambda: PohodaExporter(corrected).export(), len(invoice.items))
+        report('CachedPohodaExporter, empty cache', cold, len(invoice.items))
+        exporter = warm()
+        assert exporter.export() == PohodaExporter(corrected).export()
+        exporter = warm()
+        optimized = report('CachedPohodaExporter, corrected invoice', exporter.export, len(invoice.items), number=1)
+        print(f'{"speedup":<40} {baseline / optimized:10.2f}x')
+
+
+if __name__ == '__main__':
+    main()
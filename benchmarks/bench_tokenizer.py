@@ -0,0 +1,34 @@
+"""Row throughput of the Kros tokenizer compared to the generic CSV reader.
+
+Run from the repository root: python -m benchmarks.bench_tokenizer
+"""
+import csv
+import io
+
+from benchmarks.common import generate_invoice, report
+from converter.parser import KrosParser
+from converter.tokenizer import KrosTokenizer
+
+
+def main():
+    for item_rows in (10_000, 100_000, 500_000):
+        data = generate_invoice(item_rows)
+        rows = data.count('\n') + 1
+        print(f'--- {item_rows:,} item rows, {len(data) / 1e6:.1f} MB')
+
+        def generic():
+            dialect = csv.Sniffer().sniff(data[:1024])
+            for _ in csv.reader(io.StringIO(data), delimiter=KrosParser.csv_separator, dialect=dialect):
+                pass
+
+        def tokenizer():
+            for _ in KrosTokenizer(data, KrosParser.layout_columns):
+                pass
+
+        baseline = report('csv.Sniffer + csv.reader', generic, rows)
+        optimized = report('KrosTokenizer', tokenizer, rows)
+        print(f'{"speedup":<40} {baseline / optimized:10.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+import os
+import timeit
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+
+def load_example(file_name: str, encoding: str) -> str:
+    with open(os.path.join(EXAMPLES_DIR, file_name), 'r', encoding=encoding, newline='') as f:
+        return f.read()
+
+
+def generate_invoice(item_rows: int, file_name='2-input-windows-1250.csv', encoding='windows-1250') -> str:
+    """Generate a large Kros export by repeating the item rows of an example invoice."""
+    lines = load_example(file_name, encoding).split('\n')
+    start = next(i for i, line in enumerate(lines) if 'kombinovanej' in line) + 1
+    end = next(i for i in range(start, len(lines)) if not lines[i].split(';')[20])
+    items = lines[start:end]
+    generated = [f'{n + 1}.;' + items[n % len(items)].split(';', 1)[1] for n in range(item_rows)]
+    return '\n'.join(lines[:start] + generated + lines[end:])
+
+
+def report(name: str, func, rows: int, number=3):
+    seconds = min(timeit.repeat(func, number=1, repeat=number))
+    print(f'{name:<40} {seconds * 1000:10.1f} ms {rows / seconds:14,.0f} rows/s')
+    return seconds
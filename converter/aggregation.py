@@ -2,12 +2,18 @@ from collections import OrderedDict
 from decimal import Decimal
 from typing import Iterable, List
 
+from converter.catalogue import KnCatalogue
 from converter.model import Invoice, InvoiceItem, InvoiceItemAggregate
 
 
 class InvoiceAggregator:
-    def __init__(self, invoice: Invoice):
+    def __init__(self, invoice: Invoice, catalogue: KnCatalogue = None):
+        self._invoice = invoice
+        if catalogue is None:
+            catalogue = KnCatalogue.default()
+        catalogue.annotate(invoice.items)
         self.aggregates = self._aggregate_items(self.filter_irrelevant(invoice.items))
+        catalogue.annotate(self.aggregates)
 
     @staticmethod
     def filter_irrelevant(items: Iterable[InvoiceItem]) -> Iterable[InvoiceItem]:
@@ -34,6 +40,15 @@ class InvoiceAggregator:
             aggregate.total += item.total
         return list(aggregates.values())
 
+    @property
+    def unknown_codes(self) -> List[str]:
+        """Distinct item codes not found in the KN catalogue, in order of appearance."""
+        codes = OrderedDict()
+        for item in self._invoice.items:
+            if item.code and item.kn_description is None:
+                codes[item.code] = None
+        return list(codes)
+
     @property
     def total(self) -> Decimal:
         return sum((item.total for item in self.aggregates), Decimal(0))
@@ -0,0 +1,78 @@
+import os
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+
+from converter.model import InvoiceItemAggregate
+
+DEFAULT_CATALOGUE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'kn.tsv')
+
+
+def normalize_code(code: str) -> str:
+    return ''.join(code.split())
+
+
+class KnCatalogue:
+    """Catalogue of combined nomenclature (KN) codes with a sorted array index for prefix lookups.
+
+    The bundled file is already sorted by code, so loading it only splits the lines into two parallel tuples and
+    every lookup is a binary search. A code is known if a heading (4 digits) or a more specific subheading of the
+    catalogue is its prefix, the most specific entry wins.
+    """
+    heading_length = 4
+
+    def __init__(self, codes: Tuple[str, ...], descriptions: Tuple[str, ...]):
+        if any(codes[i] >= codes[i + 1] for i in range(len(codes) - 1)):
+            raise ValueError('Číselník KN musí byť zoradený podľa kódu a bez duplicít')
+        self._codes = codes
+        self._descriptions = descriptions
+        self._lengths = sorted({len(code) for code in codes if len(code) >= self.heading_length}, reverse=True)
+
+    @classmethod
+    def load(cls, path: str) -> 'KnCatalogue':
+        codes, descriptions = [], []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip() or line.startswith('#'):
+                    continue
+                code, description = line.rstrip('\n').split('\t', 1)
+                codes.append(code)
+                descriptions.append(description)
+        return cls(tuple(codes), tuple(descriptions))
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def default() -> 'KnCatalogue':
+        """The bundled catalogue, loaded once per process."""
+        return KnCatalogue.load(DEFAULT_CATALOGUE_PATH)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def _find(self, code: str) -> Optional[int]:
+        index = bisect_left(self._codes, code)
+        if index < len(self._codes) and self._codes[index] == code:
+            return index
+        return None
+
+    def lookup(self, code: str) -> Optional[str]:
+        """Description of the most specific catalogue entry matching the code, None if the code is unknown."""
+        code = normalize_code(code)
+        for length in self._lengths:
+            if len(code) < length:
+                continue
+            index = self._find(code[:length])
+            if index is not None:
+                return self._descriptions[index]
+        return None
+
+    def annotate(self, items: Iterable[InvoiceItemAggregate]):
+        """Fill in the KN description of items with a code, looking up every distinct code only once."""
+        descriptions = {}
+        for item in items:
+            if not item.code:
+                continue
+            try:
+                item.kn_description = descriptions[item.code]
+            except KeyError:
+                item.kn_description = descriptions[item.code] = self.lookup(item.code)
@@ -0,0 +1,25 @@
+import codecs
+import re
+
+UTF_8_BOM = codecs.BOM_UTF8
+NON_ASCII_RE = re.compile(rb'[\x80-\xff]')
+
+
+def detect_encoding(raw_data: bytes, sample_size: int = 4096) -> str:
+    """Detect the encoding of a Kros export without decoding all of it.
+
+    A BOM means UTF-8. Otherwise only a sample starting at the first non-ASCII byte is checked: Windows 1250 texts
+    with Slovak characters are practically never valid UTF-8, while a valid UTF-8 file is valid in any such sample.
+    Pure ASCII files are reported as UTF-8, which decodes them the same as Windows 1250.
+    """
+    if raw_data.startswith(UTF_8_BOM):
+        return 'utf-8-sig'
+    match = NON_ASCII_RE.search(raw_data)
+    if match is None:
+        return 'utf-8'
+    sample = raw_data[match.start():match.start() + sample_size]
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return 'windows-1250'
+    return 'utf-8'
@@ -1,5 +1,8 @@
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from decimal import Decimal
+from typing import Hashable, List, Optional
 
 from lxml import etree
 from lxml.builder import ElementMaker
@@ -50,13 +53,16 @@ class PohodaExporter(BaseExporter):
     def _make_invoice(self):
         return self.INV.invoice(
             self._make_header(),
-            self.INV.invoiceDetail(
-                *(self._make_invoice_item(item) for item in self._invoice.items),
-            ),
+            self._make_invoice_detail(),
             self._make_summary(),
             version="2.0",
         )
 
+    def _make_invoice_detail(self):
+        return self.INV.invoiceDetail(
+            *(self._make_invoice_item(item) for item in self._invoice.items),
+        )
+
     def _make_header(self):
         return self.INV.invoiceHeader(
             self.INV.invoiceType('issuedInvoice'),
@@ -140,18 +146,22 @@ class PohodaExporter(BaseExporter):
             self.TYP.accountNo(account),
         )
 
-    def _make_invoice_item(self, item: InvoiceItem):
+    @staticmethod
+    def _vat_type(item: InvoiceItem) -> str:
         if item.vat == 0:
-            vat_type = 'none'
+            return 'none'
         elif item.vat == 5:
-            vat_type = 'third'
+            return 'third'
         elif item.vat in (10, 19):
-            vat_type = 'low'
+            return 'low'
         elif item.vat in (20, 23):
-            vat_type = 'high'
+            return 'high'
         else:
             raise ValueError(f'Neznáma sadzba DPH {item.vat} v položke {item.name}')
 
+    def _make_invoice_item(self, item: InvoiceItem):
+        vat_type = self._vat_type(item)
+
         if vat_type == 'none':
             args = (
                 self.INV.classificationKVDPH(self.TYP.ids('A2CN')),
@@ -216,3 +226,88 @@ class PohodaExporter(BaseExporter):
                 ),
             ),
         )
+
+
+class ItemFragmentCache:
+    """Bounded LRU cache of serialized invoice item fragments, shared by the threads of a worker process."""
+
+    def __init__(self, max_size: int = 20000):
+        self.max_size = max_size
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._fragments)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+            return fragment
+
+    def put(self, key: Hashable, fragment: str):
+        with self._lock:
+            self._fragments[key] = fragment
+            if len(self._fragments) > self.max_size:
+                self._fragments.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+
+class CachedPohodaExporter(PohodaExporter):
+    """Pohoda exporter reusing serialized invoice items, byte for byte identical to PohodaExporter.
+
+    The document is serialized with a placeholder comment in place of the items, which is then replaced by item
+    fragments. Items missing from the cache are serialized together at the same depth as in the document, so their
+    indentation is the same too. Corrected invoices and repeated orders only build the changed or new items.
+    """
+    fragment_cache = ItemFragmentCache()
+    ITEMS_PLACEHOLDER = 'invoice-items'
+    FRAGMENT_SEPARATOR = 'fragment'
+
+    def export(self) -> str:
+        if not self._invoice.items:
+            return super().export()
+        document = super().export()
+        placeholder = document.index(f'<!--{self.ITEMS_PLACEHOLDER}-->')
+        line_start = document.rindex('\n', 0, placeholder) + 1
+        line_end = document.index('\n', placeholder) + 1
+        return document[:line_start] + ''.join(self._get_item_fragments()) + document[line_end:]
+
+    def _make_invoice_detail(self):
+        if not self._invoice.items:
+            return super()._make_invoice_detail()
+        return self.INV.invoiceDetail(etree.Comment(self.ITEMS_PLACEHOLDER))
+
+    @classmethod
+    def _item_key(cls, item: InvoiceItem) -> tuple:
+        # str() of the amounts, since equal Decimals like 1.0 and 1.00 are serialized differently
+        return (item.name, str(item.quantity), item.unit, str(item.unit_price), str(item.total_no_vat),
+                str(item.total), item.code, cls._vat_type(item))
+
+    def _get_item_fragments(self) -> List[str]:
+        keys = [self._item_key(item) for item in self._invoice.items]
+        fragments = [self.fragment_cache.get(key) for key in keys]
+        missing = [index for index, fragment in enumerate(fragments) if fragment is None]
+        if missing:
+            built = self._serialize_items([self._invoice.items[index] for index in missing])
+            for index, fragment in zip(missing, built):
+                fragments[index] = fragment
+                self.fragment_cache.put(keys[index], fragment)
+        return fragments
+
+    def _serialize_items(self, items: List[InvoiceItem]) -> List[str]:
+        detail = self.INV.invoiceDetail(etree.Comment(self.FRAGMENT_SEPARATOR))
+        for item in items:
+            detail.append(self._make_invoice_item(item))
+            detail.append(etree.Comment(self.FRAGMENT_SEPARATOR))
+        serialized = etree.tostring(
+            self.DAT.dataPack(self.DAT.dataPackItem(self.INV.invoice(detail))),
+            encoding='unicode', pretty_print=True,
+        )
+        # every part starts with the rest of the separator line and ends with the indentation of the next separator
+        parts = serialized.split(f'<!--{self.FRAGMENT_SEPARATOR}-->')[1:-1]
+        return [part[1:part.rindex('\n') + 1] for part in parts]
@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 from decimal import Decimal
-from typing import List
+from typing import List, Optional
 
 
 @dataclass
@@ -10,6 +10,7 @@ class InvoiceItemAggregate:
     unit: str = ''
     vat: Decimal = Decimal(0)
     total: Decimal = Decimal(0)
+    kn_description: Optional[str] = None
 
 
 @dataclass
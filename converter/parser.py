@@ -4,26 +4,45 @@ import re
 from decimal import Decimal
 from typing import Iterable, List, Iterator, Tuple
 
+from converter.encoding import detect_encoding
 from converter.model import InvoiceItem, Invoice
-
-WHITESPACE_RE = re.compile(r'\s', re.UNICODE)
+from converter.tokenizer import KrosTokenizer
 
 
 class FormatError(ValueError):
     pass
 
 
-def convert_decimal(value):
-    return Decimal(WHITESPACE_RE.sub('', value).replace(',', '.'))
+def convert_decimal(value: str) -> Decimal:
+    """Convert a Kros amount like "1 386,90" to Decimal."""
+    # str.split() without arguments drops any Unicode whitespace, including the NBSP thousands separators
+    return Decimal(''.join(value.split()).replace(',', '.'))
+
+
+AMOUNT_CACHE_SIZE = 4096
+_amount_cache = {}
+
+
+def convert_repeated_decimal(value: str) -> Decimal:
+    """Same as convert_decimal, for columns with often repeated values such as VAT rates, using a bounded cache."""
+    amount = _amount_cache.get(value)
+    if amount is None:
+        if len(_amount_cache) >= AMOUNT_CACHE_SIZE:
+            _amount_cache.clear()
+        amount = _amount_cache[value] = convert_decimal(value)
+    return amount
 
 
 class KrosParser:
     csv_separator = ';'
     min_columns = 32
+    layout_columns = 32
 
     def __init__(self, file):
         raw_data = file.read()
-        for encoding in ['utf-8-sig', 'utf-8', 'windows-1250']:
+        detected = detect_encoding(raw_data)
+        # a file which only looked like UTF-8 in the sampled part still gets a chance as Windows 1250
+        for encoding in [detected] if detected == 'windows-1250' else [detected, 'windows-1250']:
             try:
                 data = raw_data.decode(encoding)
                 break
@@ -31,11 +50,17 @@ class KrosParser:
                 continue
         else:
             raise FormatError('Nesprávne kódovanie, musí byť UTF-8 alebo Windows 1250')
+        self.reader: Iterator[List[str]] = self._make_reader(data)
+
+    def _make_reader(self, data: str) -> Iterator[List[str]]:
+        """Use the specialized Kros tokenizer, falling back to the generic CSV reader for unexpected layouts."""
+        if KrosTokenizer.accepts(data, self.min_columns):
+            return iter(KrosTokenizer(data, self.layout_columns))
         try:
             dialect = csv.Sniffer().sniff(data[:1024])
         except Exception:
             raise FormatError('Súbor nie je v korektnom formáte CSV')
-        self.reader : Iterator[List[str]] = csv.reader(io.StringIO(data), delimiter=self.csv_separator, dialect=dialect)
+        return csv.reader(io.StringIO(data), delimiter=self.csv_separator, dialect=dialect)
 
     def _expect_col_count(self, row):
         if len(row) < self.min_columns:
@@ -217,16 +242,21 @@ class KrosParser:
             self._expect_col_count(row)
             if not row[self.items_unit_column]:
                 break
-            yield InvoiceItem(
-                code=row[col_code],
-                name=row[self.items_name_column + offset],
-                quantity=convert_decimal(row[self.items_quantity_column]),
-                unit=row[self.items_unit_column],
-                unit_price=convert_decimal(row[self.items_unit_price_column]),
-                vat=convert_decimal(row[self.items_vat_column]),
-                total_no_vat=convert_decimal(row[self.items_total_no_vat_column]),
-                total=convert_decimal(row[self.items_total_column]),
-            )
+            name = row[self.items_name_column + offset]
+            try:
+                item = InvoiceItem(
+                    code=row[col_code],
+                    name=name,
+                    quantity=convert_repeated_decimal(row[self.items_quantity_column]),
+                    unit=row[self.items_unit_column],
+                    unit_price=convert_repeated_decimal(row[self.items_unit_price_column]),
+                    vat=convert_repeated_decimal(row[self.items_vat_column]),
+                    total_no_vat=convert_decimal(row[self.items_total_no_vat_column]),
+                    total=convert_decimal(row[self.items_total_column]),
+                )
+            except ArithmeticError:
+                raise FormatError(f'Nepodarilo sa rozpoznať sumy v položke "{name}"')
+            yield item
 
     delivery_to_start = 'Tovar prevzal :'
     delivery_to_column = 0
@@ -240,11 +270,19 @@ class KrosParser:
         row = self._read_row_skipping(self.issued_by_start, expect=True, column=self.issued_by_column)
         invoice.issued_by = row[self.issued_by_column][len(self.issued_by_start):].strip()
 
-    def parse(self) -> Invoice:
-        invoice_number, offset = self._get_invoice_number()
+    def parse_header(self) -> Invoice:
+        """Parse the invoice up to the items table, which can then be read by parse_items."""
+        invoice_number, self._offset = self._get_invoice_number()
         invoice = Invoice(number=invoice_number)
-        self._read_supplier_and_meta(invoice, offset)
-        self._read_meta_and_client(invoice, offset)
-        invoice.items = list(self._read_items(offset))
+        self._read_supplier_and_meta(invoice, self._offset)
+        self._read_meta_and_client(invoice, self._offset)
+        return invoice
+
+    def parse_items(self, invoice: Invoice):
+        invoice.items = list(self._read_items(self._offset))
         self._read_final_meta(invoice)
+
+    def parse(self) -> Invoice:
+        invoice = self.parse_header()
+        self.parse_items(invoice)
         return invoice
@@ -0,0 +1,38 @@
+from django.test import SimpleTestCase
+
+from converter.aggregation import InvoiceAggregator
+from converter.catalogue import KnCatalogue
+from converter.model import Invoice, InvoiceItem
+
+
+class KnCatalogueTest(SimpleTestCase):
+    def setUp(self):
+        self.catalogue = KnCatalogue(('7217', '72171039', '7314'), ('Drôty', 'Drôty Fe', 'Pletivo'))
+
+    def test_lookup_most_specific(self):
+        self.assertEqual(self.catalogue.lookup('7217 1039'), 'Drôty Fe')
+        self.assertEqual(self.catalogue.lookup('7217 2030'), 'Drôty')
+        self.assertEqual(self.catalogue.lookup('7314'), 'Pletivo')
+
+    def test_lookup_unknown(self):
+        self.assertIsNone(self.catalogue.lookup('7218 1000'))
+        self.assertIsNone(self.catalogue.lookup('72'))
+        self.assertIsNone(self.catalogue.lookup(''))
+
+    def test_annotate(self):
+        items = [InvoiceItem(code='7314 4200'), InvoiceItem(code='9999'), InvoiceItem(code='')]
+        self.catalogue.annotate(items)
+        self.assertEqual([item.kn_description for item in items], ['Pletivo', None, None])
+
+    def test_unsorted(self):
+        with self.assertRaises(ValueError):
+            KnCatalogue(('7314', '7217'), ('Pletivo', 'Drôty'))
+
+    def test_default(self):
+        self.assertIs(KnCatalogue.default(), KnCatalogue.default())
+        self.assertEqual(KnCatalogue.default().lookup('7217 1039'), 'Drôty zo železa alebo z nelegovanej ocele')
+
+    def test_aggregator_empty_catalogue(self):
+        invoice = Invoice(items=[InvoiceItem(code='7314 4200')])
+        self.assertEqual(InvoiceAggregator(invoice, KnCatalogue((), ())).unknown_codes, ['7314 4200'])
+        self.assertEqual(InvoiceAggregator(invoice).unknown_codes, [])
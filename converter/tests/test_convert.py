@@ -1,7 +1,13 @@
+import json
 import os
+import tempfile
+from unittest import mock
 
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, override_settings
+
+from converter.export import CachedPohodaExporter
+from converter.uploads import ChunkedUpload
 
 
 class ViewTest(SimpleTestCase):
@@ -11,6 +17,7 @@ class ViewTest(SimpleTestCase):
         resp = self.client.get('/')
         self.assertEqual(resp.status_code, 200)
         self.assertContains(resp, 'id="upload"')
+        self.assertContains(resp, 'zjednodušená lokálna schéma')
 
     def _test_convert(self, input_csv, expected):
         upload = SimpleUploadedFile('file.csv', input_csv, content_type='text/csv')
@@ -33,6 +40,7 @@ class ViewTest(SimpleTestCase):
             'invoice_number': '180001',
             'table': self._load_file('1-output-table.html', 'utf-8'),
             'pohoda_xml': self._load_file('1-output-pohoda.xml', 'utf-8'),
+            'unknown_codes': [],
         })
 
     def test_convert_2_windows_1250(self):
@@ -56,12 +64,245 @@ class ViewTest(SimpleTestCase):
             'pohoda_xml': self._load_file('4-output-pohoda.xml', 'utf-8'),
         })
 
+    def test_convert_quote_in_item_name(self):
+        input_csv = self._load_file('3-input-windows-1250.csv', 'windows-1250')
+        input_csv = input_csv.replace('Sieť Zn 3,10/0,8/100;', 'Sieť Zn 3,10/0,8/100 1/2";')
+        upload = SimpleUploadedFile('file.csv', input_csv.encode('windows-1250'), content_type='text/csv')
+        resp = self.client.post('/convert', {'file': upload})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['table'], self._load_file('3-output-table.html', 'utf-8'))
+        self.assertIn('<inv:text>Sieť Zn 3,10/0,8/100 1/2"</inv:text>', resp.json()['pohoda_xml'])
+
+    def test_convert_item_codes(self):
+        input_csv = self._load_file('3-input-windows-1250.csv', 'windows-1250').replace('7308 9098', '9999 9999')
+        upload = SimpleUploadedFile('file.csv', input_csv.encode('windows-1250'), content_type='text/csv')
+        response_json = self.client.post('/convert', {'file': upload}).json()
+        self.assertEqual(response_json['unknown_codes'], ['9999 9999'])
+        item_codes = response_json['item_codes']
+        self.assertEqual(item_codes[0]['name'], 'Pletivo 4-hran PVC 200')
+        self.assertEqual(item_codes[0]['code'], '7314 4200')
+        self.assertTrue(item_codes[0]['kn_description'].startswith('Tkaniny, mriežky, sieťovina'))
+        self.assertEqual(item_codes[3], {'name': 'Stĺpik poplast. 230/48 Zn+PVC', 'code': '9999 9999',
+                                         'kn_description': None})
+
+    def test_convert_validate(self):
+        upload = SimpleUploadedFile('file.csv', self._load_file('4-input-windows-1250.csv', 'windows-1250')
+                                    .encode('windows-1250'), content_type='text/csv')
+        resp = self.client.post('/convert', {'file': upload, 'validate': '1'})
+        self.assertEqual(resp.status_code, 200)
+        validation = resp.json()['validation']
+        self.assertTrue(validation['valid'])
+        self.assertEqual(validation['errors'], [])
+        self.assertTrue(validation['reduced_schema'])
+
+    def test_convert_stream(self):
+        upload = SimpleUploadedFile('file.csv', self._load_file('1-input-utf-8.csv', 'utf-8').encode('utf-8'),
+                                    content_type='text/csv')
+        resp = self.client.post('/convert', {'file': upload, 'stream': '1', 'validate': '1'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        events = [json.loads(line) for line in b''.join(resp.streaming_content).decode('utf-8').splitlines()]
+        names = [event['event'] for event in events]
+        self.assertEqual(names[0], 'header')
+        self.assertEqual(events[0]['invoice']['number'], '180001')
+        self.assertNotIn('items', events[0]['invoice'])
+        table = names.index('table')
+        self.assertEqual(names[1:table], ['aggregate'] * (table - 1))
+        self.assertEqual(events[1]['code'], '7314')
+        self.assertEqual(events[table]['table'], self._load_file('1-output-table.html', 'utf-8'))
+        self.assertEqual(events[table]['item_codes'][0]['name'], 'Panel BRICO 123cm/250cm/4mm')
+        self.assertEqual(names[-2:], ['validation', 'end'])
+        self.assertTrue(events[-2]['valid'])
+        xml = ''.join(event['chunk'] for event in events if event['event'] == 'pohoda_xml')
+        self.assertEqual(xml, self.client.post('/convert', {
+            'file': SimpleUploadedFile('file.csv', self._load_file('1-input-utf-8.csv', 'utf-8').encode('utf-8')),
+        }).json()['pohoda_xml'])
+
+    def test_convert_stream_error_in_header(self):
+        upload = SimpleUploadedFile('file.csv', b'a,b,c\n1,2,3', content_type='text/csv')
+        resp = self.client.post('/convert', {'file': upload, 'stream': '1'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('Nesprávny počet stĺpcov', resp.content.decode('utf-8'))
+
+    def _load_invalid_amount(self):
+        input_csv = self._load_file('3-input-windows-1250.csv', 'windows-1250')
+        input_csv = input_csv.replace('5,33;0;;;;106,60;', '5,33;0;;;;106,6O;')
+        return SimpleUploadedFile('file.csv', input_csv.encode('windows-1250'), content_type='text/csv')
+
+    def test_convert_error_amount(self):
+        resp = self.client.post('/convert', {'file': self._load_invalid_amount()})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('Nepodarilo sa rozpoznať sumy v položke "Sieť Zn 3,10/0,8/100"', resp.content.decode('utf-8'))
+
+    def test_convert_stream_error_in_items(self):
+        resp = self.client.post('/convert', {'file': self._load_invalid_amount(), 'stream': '1'})
+        self.assertEqual(resp.status_code, 200)
+        events = [json.loads(line) for line in b''.join(resp.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual([event['event'] for event in events], ['header', 'error'])
+        self.assertIn('Sieť Zn 3,10/0,8/100', events[1]['message'])
+
+    def test_convert_stream_unexpected_error(self):
+        upload = SimpleUploadedFile('file.csv', self._load_file('1-input-utf-8.csv', 'utf-8').encode('utf-8'),
+                                    content_type='text/csv')
+        with mock.patch.object(CachedPohodaExporter, 'export', side_effect=RuntimeError('boom')), \
+                self.assertLogs('converter.views', 'ERROR') as logs:
+            resp = self.client.post('/convert', {'file': upload, 'stream': '1'})
+            events = [json.loads(line) for line in b''.join(resp.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual(events[-1], {'event': 'error', 'message': 'Pri spracovaní faktúry nastala neočakávaná chyba'})
+        self.assertIn('boom', logs.output[0])
+
+    def _post_chunk(self, data, index, chunk_size, uuid='0f8fad5b-d9cb-469f-a165-70867728950e'):
+        chunk = SimpleUploadedFile('blob', data[index * chunk_size:(index + 1) * chunk_size])
+        return self.client.post('/convert', {
+            'file': chunk,
+            'dzuuid': uuid,
+            'dzchunkindex': index,
+            'dztotalfilesize': len(data),
+            'dzchunksize': chunk_size,
+            'dztotalchunkcount': -(-len(data) // chunk_size),
+        })
+
+    def test_convert_chunked(self):
+        data = self._load_file('3-input-windows-1250.csv', 'windows-1250').encode('windows-1250')
+        chunk_size = len(data) // 3 + 1
+        with tempfile.TemporaryDirectory() as upload_dir, override_settings(CHUNKED_UPLOAD_DIR=upload_dir):
+            resp = self._post_chunk(data, 1, chunk_size)
+            self.assertEqual(resp.json(), {'chunks_received': 1, 'chunks_total': 3})
+            # a chunk re-sent after a dropped connection replaces the stored one
+            self._post_chunk(data, 1, chunk_size)
+            resp = self._post_chunk(data, 0, chunk_size)
+            self.assertEqual(resp.json(), {'chunks_received': 2, 'chunks_total': 3})
+            resp = self._post_chunk(data, 2, chunk_size)
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.json()['invoice_number'], '190111')
+            self.assertEqual(resp.json()['table'], self._load_file('3-output-table.html', 'utf-8'))
+            self.assertEqual(os.listdir(upload_dir), ['0f8fad5b-d9cb-469f-a165-70867728950e.claimed'])
+
+    def test_convert_chunked_final_resent(self):
+        data = self._load_file('3-input-windows-1250.csv', 'windows-1250').encode('windows-1250')
+        chunk_size = len(data) // 3 + 1
+        with tempfile.TemporaryDirectory() as upload_dir, override_settings(CHUNKED_UPLOAD_DIR=upload_dir):
+            for index in range(3):
+                resp = self._post_chunk(data, index, chunk_size)
+            # the response to the final chunk was cut off, so it is sent again
+            resent = self._post_chunk(data, 2, chunk_size)
+            self.assertEqual(resent.status_code, 200)
+            self.assertEqual(resent.json(), resp.json())
+            self.assertEqual(os.listdir(upload_dir), ['0f8fad5b-d9cb-469f-a165-70867728950e.claimed'])
+
+    def test_convert_chunked_claimed_expired(self):
+        data = self._load_file('3-input-windows-1250.csv', 'windows-1250').encode('windows-1250')
+        chunk_size = len(data) // 3 + 1
+        with tempfile.TemporaryDirectory() as upload_dir, override_settings(CHUNKED_UPLOAD_DIR=upload_dir):
+            for index in range(3):
+                self._post_chunk(data, index, chunk_size)
+            self._post_chunk(data, 0, chunk_size, uuid='7c9e6679-7425-40de-944b-e07fc1f90ae7')
+            self.assertEqual(len(os.listdir(upload_dir)), 2)
+            with override_settings(CHUNKED_UPLOAD_CLAIMED_MAX_AGE=-1):
+                self._post_chunk(data, 0, chunk_size, uuid='7c9e6679-7425-40de-944b-e07fc1f90ae7')
+            self.assertEqual(os.listdir(upload_dir), ['7c9e6679-7425-40de-944b-e07fc1f90ae7'])
+            with override_settings(CHUNKED_UPLOAD_MAX_AGE=-1):
+                self._post_chunk(data, 0, chunk_size)
+            self.assertEqual(os.listdir(upload_dir), ['0f8fad5b-d9cb-469f-a165-70867728950e'])
+
+    def test_convert_chunked_resume(self):
+        data = self._load_file('3-input-windows-1250.csv', 'windows-1250').encode('windows-1250')
+        chunk_size = len(data) // 3 + 1
+        query = {
+            'dzuuid': '0f8fad5b-d9cb-469f-a165-70867728950e',
+            'dztotalfilesize': len(data),
+            'dzchunksize': chunk_size,
+            'dztotalchunkcount': 3,
+        }
+        with tempfile.TemporaryDirectory() as upload_dir, override_settings(CHUNKED_UPLOAD_DIR=upload_dir):
+            self.assertEqual(self.client.get('/convert', query).json(), {'received_chunks': [], 'chunks_total': 3})
+            self._post_chunk(data, 1, chunk_size)
+            self.assertEqual(self.client.get('/convert', query).json(), {'received_chunks': [1], 'chunks_total': 3})
+            self._post_chunk(data, 0, chunk_size)
+            self.assertEqual(self.client.get('/convert', query).json()['received_chunks'], [0, 1])
+            resp = self._post_chunk(data, 2, chunk_size)
+            self.assertEqual(resp.json()['invoice_number'], '190111')
+            self.assertEqual(self.client.get('/convert', query).json()['received_chunks'], [])
+            resp = self.client.get('/convert', {**query, 'dztotalchunkcount': 2})
+            self.assertEqual(resp.status_code, 400)
+
+    def test_convert_get(self):
+        self.assertEqual(self.client.get('/convert').status_code, 405)
+
+    def test_convert_chunked_final_first(self):
+        data = self._load_file('3-input-windows-1250.csv', 'windows-1250').encode('windows-1250')
+        chunk_size = len(data) // 3 + 1
+        with tempfile.TemporaryDirectory() as upload_dir, override_settings(CHUNKED_UPLOAD_DIR=upload_dir):
+            self._post_chunk(data, 0, chunk_size)
+            resp = self._post_chunk(data, 2, chunk_size)
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn('Chýbajú niektoré časti', resp.content.decode('utf-8'))
+            self.assertEqual(os.listdir(upload_dir), [])
+
+    def test_convert_chunked_claimed_concurrently(self):
+        data = self._load_file('3-input-windows-1250.csv', 'windows-1250').encode('windows-1250')
+        chunk_size = len(data) // 3 + 1
+        with tempfile.TemporaryDirectory() as upload_dir, override_settings(CHUNKED_UPLOAD_DIR=upload_dir):
+            for index in range(3):
+                self._post_chunk(data, index, chunk_size)
+            upload = ChunkedUpload(upload_dir, '0f8fad5b-d9cb-469f-a165-70867728950e', len(data), chunk_size, 3)
+            # a request which finds the chunks already claimed only reads them
+            upload.claim()
+            self.assertTrue(upload.claimed)
+            self.assertEqual(upload.assemble().read(), data)
+
+    def test_convert_chunked_invalid_file(self):
+        data = b'a,b,c\n1,2,3\n'
+        with tempfile.TemporaryDirectory() as upload_dir, override_settings(CHUNKED_UPLOAD_DIR=upload_dir):
+            self._post_chunk(data, 0, 8)
+            resp = self._post_chunk(data, 1, 8)
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn('Nesprávny počet stĺpcov', resp.content.decode('utf-8'))
+            self.assertEqual(self._post_chunk(data, 1, 8).content, resp.content)
+            self.assertEqual(os.listdir(upload_dir), ['0f8fad5b-d9cb-469f-a165-70867728950e.claimed'])
+
+    def test_convert_chunked_capacity(self):
+        data = self._load_file('3-input-windows-1250.csv', 'windows-1250').encode('windows-1250')
+        chunk_size = len(data) // 3 + 1
+        other_uuid = '7c9e6679-7425-40de-944b-e07fc1f90ae7'
+        with tempfile.TemporaryDirectory() as upload_dir, override_settings(CHUNKED_UPLOAD_DIR=upload_dir):
+            with override_settings(CHUNKED_UPLOAD_MAX_PENDING_SIZE=len(data) - 1):
+                resp = self._post_chunk(data, 0, chunk_size)
+                self.assertEqual(resp.status_code, 503)
+                self.assertIn('skúste to neskôr', resp.content.decode('utf-8'))
+            with override_settings(CHUNKED_UPLOAD_MAX_PENDING=1):
+                self.assertEqual(self._post_chunk(data, 0, chunk_size).status_code, 200)
+                self.assertEqual(self._post_chunk(data, 0, chunk_size, uuid=other_uuid).status_code, 503)
+                # uploads already started continue
+                self.assertEqual(self._post_chunk(data, 1, chunk_size).status_code, 200)
+            self.assertEqual(ChunkedUpload.pending(upload_dir), (1, 2 * chunk_size))
+
+    def test_convert_chunked_errors(self):
+        data = b'a;b;c'
+        with tempfile.TemporaryDirectory() as upload_dir, override_settings(CHUNKED_UPLOAD_DIR=upload_dir):
+            resp = self._post_chunk(data, 0, 2, uuid='../escape')
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn('Neplatný identifikátor', resp.content.decode('utf-8'))
+            resp = self._post_chunk(data, 3, 2)
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn('Neplatné poradie', resp.content.decode('utf-8'))
+            resp = self._post_chunk(b'x' * 1001, 0, 1)
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn('Nesprávny počet častí', resp.content.decode('utf-8'))
+            self.assertEqual(os.listdir(upload_dir), [])
+
     def test_convert_error_csv(self):
         upload = SimpleUploadedFile('file.csv', b'a;b;c\n1;2', content_type='text/csv')
         resp = self.client.post('/convert', {'file': upload})
         self.assertEqual(resp.status_code, 400)
         self.assertIn('Súbor nie je v korektnom formáte CSV', resp.content.decode('utf-8'))
 
+    def test_convert_error_encoding(self):
+        upload = SimpleUploadedFile('file.csv', b'a;b;\x81\x83', content_type='text/csv')
+        resp = self.client.post('/convert', {'file': upload})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('Nesprávne kódovanie', resp.content.decode('utf-8'))
+
     def test_convert_error_columns(self):
         upload = SimpleUploadedFile('file.csv', b'a,b,c\n1,2,3', content_type='text/csv')
         resp = self.client.post('/convert', {'file': upload})
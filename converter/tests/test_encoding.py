@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase
+
+from converter.encoding import detect_encoding
+
+
+class DetectEncodingTest(SimpleTestCase):
+    text = 'DODÁVATEĽ:;;FAKTÚRA číslo:;180001\n'
+
+    def test_bom(self):
+        self.assertEqual(detect_encoding(b'\xef\xbb\xbf' + self.text.encode('utf-8')), 'utf-8-sig')
+
+    def test_utf_8(self):
+        self.assertEqual(detect_encoding(self.text.encode('utf-8')), 'utf-8')
+
+    def test_windows_1250(self):
+        self.assertEqual(detect_encoding(self.text.encode('windows-1250')), 'windows-1250')
+
+    def test_non_ascii_after_ascii_prefix(self):
+        raw_data = b'a;b;c\n' * 10000 + self.text.encode('windows-1250')
+        self.assertEqual(detect_encoding(raw_data), 'windows-1250')
+
+    def test_sample_ends_inside_character(self):
+        raw_data = 'ľ'.encode('utf-8') * 10
+        self.assertEqual(detect_encoding(raw_data, sample_size=5), 'utf-8')
+
+    def test_ascii(self):
+        self.assertEqual(detect_encoding(b'a;b;c\n'), 'utf-8')
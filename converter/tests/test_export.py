@@ -0,0 +1,56 @@
+import dataclasses
+import glob
+import os
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from converter.export import PohodaExporter, CachedPohodaExporter, ItemFragmentCache
+from converter.model import Invoice
+from converter.parser import KrosParser
+
+
+class CachedPohodaExporterTest(SimpleTestCase):
+    def setUp(self):
+        CachedPohodaExporter.fragment_cache.clear()
+
+    @staticmethod
+    def _parse_examples():
+        examples_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'examples')
+        for path in sorted(glob.glob(os.path.join(examples_dir, '*.csv'))):
+            with open(path, 'rb') as f:
+                yield KrosParser(f).parse()
+
+    def test_identical_output(self):
+        for invoice in self._parse_examples():
+            expected = PohodaExporter(invoice).export()
+            self.assertEqual(CachedPohodaExporter(invoice).export(), expected)
+            self.assertEqual(CachedPohodaExporter(invoice).export(), expected)
+
+    def test_no_items(self):
+        invoice = Invoice(number='1')
+        self.assertEqual(CachedPohodaExporter(invoice).export(), PohodaExporter(invoice).export())
+
+    def test_only_changed_items_rebuilt(self):
+        invoice = next(self._parse_examples())
+        CachedPohodaExporter(invoice).export()
+        invoice.items[0] = dataclasses.replace(invoice.items[0], quantity=invoice.items[0].quantity + 1)
+        invoice.items[1] = dataclasses.replace(invoice.items[1], total=Decimal(str(invoice.items[1].total) + '0'))
+        with mock.patch.object(CachedPohodaExporter, '_make_invoice_item',
+                               autospec=True, side_effect=PohodaExporter._make_invoice_item) as make_item:
+            xml = CachedPohodaExporter(invoice).export()
+        self.assertEqual(make_item.call_count, 2)
+        self.assertEqual(xml, PohodaExporter(invoice).export())
+
+
+class ItemFragmentCacheTest(SimpleTestCase):
+    def test_bounded_lru(self):
+        cache = ItemFragmentCache(max_size=2)
+        cache.put('a', 'A')
+        cache.put('b', 'B')
+        self.assertEqual(cache.get('a'), 'A')
+        cache.put('c', 'C')
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'A')
@@ -0,0 +1,25 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from converter import parser
+from converter.parser import convert_decimal, convert_repeated_decimal
+
+
+class ConvertDecimalTest(SimpleTestCase):
+    def test_formats(self):
+        self.assertEqual(convert_decimal('20'), Decimal('20'))
+        self.assertEqual(convert_decimal('2,08'), Decimal('2.08'))
+        self.assertEqual(convert_decimal('1 386,90'), Decimal('1386.90'))
+        self.assertEqual(convert_decimal('1\xa0664,28'), Decimal('1664.28'))
+        self.assertEqual(convert_decimal(' -12 345,6 '), Decimal('-12345.6'))
+        self.assertEqual(str(convert_decimal('10,40')), '10.40')
+
+    def test_repeated(self):
+        self.assertIs(convert_repeated_decimal('1,21'), convert_repeated_decimal('1,21'))
+        self.assertEqual(convert_repeated_decimal('1 386,90'), Decimal('1386.90'))
+
+    def test_repeated_cache_bounded(self):
+        for n in range(parser.AMOUNT_CACHE_SIZE + 10):
+            convert_repeated_decimal(str(n))
+        self.assertLessEqual(len(parser._amount_cache), parser.AMOUNT_CACHE_SIZE)
@@ -0,0 +1,39 @@
+from django.test import SimpleTestCase
+
+from converter.tokenizer import KrosTokenizer
+
+
+class KrosTokenizerTest(SimpleTestCase):
+    def test_plain_rows(self):
+        rows = list(KrosTokenizer('a;b;c\r\n\n1;;3\n', columns=5))
+        self.assertEqual(rows, [['a', 'b', 'c'], [''], ['1', '', '3']])
+
+    def test_columns_limit(self):
+        rows = list(KrosTokenizer('a;b;c;d;e\n', columns=2))
+        self.assertEqual(rows, [['a', 'b', 'c;d;e']])
+
+    def test_quoted_multiline(self):
+        rows = list(KrosTokenizer(';;"first\nsecond; still";x\nlast;row', columns=5))
+        self.assertEqual(rows, [['', '', 'first\nsecond; still', 'x'], ['last', 'row']])
+
+    def test_quote_inside_field(self):
+        rows = list(KrosTokenizer('a;5" screen;c\nd;e;f', columns=5))
+        self.assertEqual(rows, [['a', '5" screen', 'c'], ['d', 'e', 'f']])
+
+    def test_invalid_quoted_record(self):
+        long_value = 'x' * 200000
+        rows = list(KrosTokenizer(f'a;"{long_value}\nb;c', columns=5))
+        self.assertEqual(rows, [['a', f'"{long_value}'], ['b', 'c']])
+
+    def test_blocks(self):
+        data = 'a;b\r\n;"x\r\ny";c\r\n\r\n1;2;3\r\nlast\r'
+        tokenizer = KrosTokenizer(data, columns=5)
+        tokenizer.block_size = 2
+        rows = [['a', 'b'], ['', 'x\ny', 'c'], [''], ['1', '2', '3'], ['last\r']]
+        self.assertEqual(list(tokenizer), rows)
+        self.assertEqual(list(KrosTokenizer(data, columns=5)), rows)
+
+    def test_accepts(self):
+        self.assertTrue(KrosTokenizer.accepts(';;;\nx', min_columns=4))
+        self.assertFalse(KrosTokenizer.accepts(';;\n;;;;;', min_columns=4))
+        self.assertFalse(KrosTokenizer.accepts('a,b,c,d', min_columns=4))
@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from converter.validation import PohodaValidator
+
+
+class PohodaValidatorTest(SimpleTestCase):
+    @staticmethod
+    def _load_file(file_name):
+        example_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'examples', file_name)
+        with open(example_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def test_schema_compiled_once(self):
+        self.assertIs(PohodaValidator.schema(), PohodaValidator.schema())
+
+    def test_schema_dir_setting(self):
+        with tempfile.TemporaryDirectory() as schema_dir:
+            for name in ('data.xsd', 'invoice.xsd', 'type.xsd'):
+                shutil.copy(os.path.join(settings.POHODA_SCHEMA_DIR, name), schema_dir)
+            with override_settings(POHODA_SCHEMA_DIR=schema_dir):
+                schema = PohodaValidator.schema()
+                result = PohodaValidator().validate(self._load_file('1-output-pohoda.xml'))
+                self.assertTrue(result.valid)
+                self.assertFalse(result.reduced_schema)
+        self.assertIsNot(schema, PohodaValidator.schema())
+
+    def test_valid_examples(self):
+        for example in ('1-output-pohoda.xml', '2-output-pohoda.xml', '3-output-pohoda.xml', '4-output-pohoda.xml'):
+            result = PohodaValidator().validate(self._load_file(example))
+            self.assertEqual(result.errors, [], example)
+            self.assertTrue(result.valid)
+            self.assertTrue(result.reduced_schema)
+
+    def test_invalid_date(self):
+        xml = self._load_file('4-output-pohoda.xml').replace(
+            '<inv:dateDue>2019-12-06</inv:dateDue>', '<inv:dateDue>6.12.2019</inv:dateDue>')
+        result = PohodaValidator().validate(xml)
+        self.assertFalse(result.valid)
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn('dateDue', result.errors[0])
+
+    def test_malformed_xml(self):
+        result = PohodaValidator().validate('<dat:dataPack')
+        self.assertFalse(result.valid)
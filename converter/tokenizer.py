@@ -0,0 +1,110 @@
+import csv
+from operator import methodcaller
+from typing import Iterator, List, Tuple
+
+
+class KrosTokenizer:
+    """Splits the fixed CSV dialect of Kros Alfa plus exports into rows.
+
+    Kros always separates columns by ``;`` and only quotes the multi-line notes, so the lines between quoted records
+    are split directly, a block of lines at a time, and only the quoted records are handed over to the generic
+    :mod:`csv` reader. Like in :mod:`csv`, a quote only starts a quoted field at the beginning of a field, quotes
+    elsewhere (e.g. inch marks in item names) are kept as they are. Just the first ``columns`` columns are separated,
+    the rest of the line is left unsplit in the last item of the row. Empty lines are returned as a single empty column.
+    """
+    separator = ';'
+    quote = '"'
+    block_size = 64 * 1024
+
+    def __init__(self, data: str, columns: int):
+        if data.endswith('\r\n'):
+            data = data[:-2]
+        elif data.endswith('\n'):
+            data = data[:-1]
+        self._data = data
+        self._split = methodcaller('split', self.separator, columns)
+
+    @classmethod
+    def accepts(cls, data: str, min_columns: int) -> bool:
+        """Whether the first line of the data looks like a Kros export with at least the given number of columns."""
+        end = data.find('\n')
+        first_line = data if end < 0 else data[:end]
+        return first_line.count(cls.separator) >= min_columns - 1
+
+    def __iter__(self) -> Iterator[List[str]]:
+        data = self._data
+        if not data:
+            return
+        position = 0
+        for quote_position in self._field_quotes():
+            if quote_position < position:
+                # the quote is inside a quoted record which was already read
+                continue
+            line_start = data.rfind('\n', 0, quote_position) + 1
+            if line_start > position:
+                yield from self._split_lines(position, line_start - 1)
+            row, position = self._read_quoted_record(line_start)
+            yield row
+        if position <= len(data):
+            yield from self._split_lines(position, len(data))
+
+    def _field_quotes(self) -> Iterator[int]:
+        """Positions of quotes at the beginning of a field."""
+        data = self._data
+        position = data.find(self.quote)
+        while position >= 0:
+            if position == 0 or data[position - 1] in (self.separator, '\n'):
+                yield position
+            position = data.find(self.quote, position + 1)
+
+    def _split_lines(self, start: int, end: int) -> Iterator[List[str]]:
+        """Split the lines between the two positions, end being the position of the last line's line break."""
+        data, split = self._data, self._split
+        while True:
+            block_end = data.find('\n', start + self.block_size, end) if start + self.block_size < end else -1
+            if block_end < 0:
+                block_end = end
+            block = data[start:block_end]
+            if '\r' not in block:
+                lines = block.split('\n')
+            else:
+                if block_end < len(data) and block.endswith('\r'):
+                    block = block[:-1]
+                lines = block.split('\r\n')
+                if len(lines) != block.count('\n') + 1:
+                    # mixed line endings
+                    lines = block.replace('\r\n', '\n').split('\n')
+            yield from map(split, lines)
+            if block_end == end:
+                return
+            start = block_end + 1
+
+    def _read_quoted_record(self, start: int) -> Tuple[List[str], int]:
+        """Read a record with quoted fields, returning it with the position of the line following it."""
+        data = self._data
+        next_position = [start]
+
+        def lines():
+            position = start
+            while position <= len(data):
+                end = data.find('\n', position)
+                if end < 0:
+                    end = len(data)
+                line = self._line(position, end)
+                position = next_position[0] = end + 1
+                yield line + '\n'
+
+        try:
+            return next(csv.reader(lines(), delimiter=self.separator), []), next_position[0]
+        except csv.Error:
+            # not a valid quoted record after all, keep the quotes as they are
+            end = data.find('\n', start)
+            if end < 0:
+                end = len(data)
+            return self._split(self._line(start, end)), end + 1
+
+    def _line(self, start: int, end: int) -> str:
+        """The line between the two positions without its line break, end being the position of the ``\\n``."""
+        if start < end < len(self._data) and self._data[end - 1] == '\r':
+            end -= 1
+        return self._data[start:end]
@@ -0,0 +1,163 @@
+import io
+import os
+import re
+import shutil
+import time
+from typing import List, Mapping, Tuple
+
+
+class ChunkError(ValueError):
+    pass
+
+
+class UploadCapacityError(ChunkError):
+    pass
+
+
+class ChunkedUpload:
+    """Chunks of a single Dropzone upload, stored on local disk until the last one arrives.
+
+    Every chunk is written to its own file named by its index, so a chunk re-sent after a dropped connection simply
+    replaces the previous attempt and the upload continues with the chunks already received. Chunks are sent one by
+    one in order, so when the final chunk completes the upload, the chunks are claimed by moving them aside. Claimed
+    chunks are kept for a while, so that a final chunk re-sent after its response was cut off converts them again.
+    """
+    UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+    chunk_suffix = '.part'
+    claimed_suffix = '.claimed'
+    max_chunk_count = 1000
+
+    def __init__(self, upload_dir: str, uuid: str, total_size: int, chunk_size: int, chunk_count: int):
+        self.directory = os.path.join(upload_dir, uuid)
+        self.claimed_directory = self.directory + self.claimed_suffix
+        self.total_size = total_size
+        self.chunk_size = chunk_size
+        self.chunk_count = chunk_count
+
+    @classmethod
+    def from_params(cls, upload_dir: str, params: Mapping[str, str], max_size: int) -> 'ChunkedUpload':
+        uuid = params.get('dzuuid', '')
+        if not cls.UUID_RE.match(uuid):
+            raise ChunkError('Neplatný identifikátor nahrávaného súboru')
+        try:
+            total_size = int(params['dztotalfilesize'])
+            chunk_size = int(params['dzchunksize'])
+            chunk_count = int(params['dztotalchunkcount'])
+        except (KeyError, ValueError):
+            raise ChunkError('Chýbajú alebo sú neplatné údaje o časti nahrávaného súboru')
+        if total_size <= 0:
+            raise ChunkError('Nahraný súbor je prázdny')
+        if total_size > max_size:
+            raise ChunkError(f'Súbor je príliš veľký, maximum je {max_size // 1024 // 1024} MB')
+        if chunk_size <= 0 or chunk_count != -(-total_size // chunk_size) or chunk_count > cls.max_chunk_count:
+            raise ChunkError('Nesprávny počet častí nahrávaného súboru')
+        return cls(upload_dir, uuid, total_size, chunk_size, chunk_count)
+
+    @staticmethod
+    def chunk_index(params: Mapping[str, str]) -> int:
+        try:
+            return int(params['dzchunkindex'])
+        except (KeyError, ValueError):
+            raise ChunkError('Neplatné poradie časti nahrávaného súboru')
+
+    def _chunk_path(self, index: int, directory: str = None) -> str:
+        return os.path.join(directory or self.directory, f'{index}{self.chunk_suffix}')
+
+    def _expected_size(self, index: int) -> int:
+        if self.is_final(index):
+            return self.total_size - index * self.chunk_size
+        return self.chunk_size
+
+    def is_final(self, index: int) -> bool:
+        return index == self.chunk_count - 1
+
+    def check_capacity(self, max_pending_size: int, max_pending_uploads: int) -> None:
+        """Refuse to start a new upload while too many uploads or bytes are kept, counting the whole new upload."""
+        if os.path.isdir(self.directory):
+            return
+        uploads, size = self.pending(os.path.dirname(self.directory))
+        if uploads >= max_pending_uploads or size + self.total_size > max_pending_size:
+            raise UploadCapacityError('Server práve spracúva priveľa súborov, skúste to neskôr')
+
+    @staticmethod
+    def pending(upload_dir: str) -> Tuple[int, int]:
+        """Number of uploads kept, claimed or not, and the total size of their chunks."""
+        uploads = size = 0
+        try:
+            entries = list(os.scandir(upload_dir))
+        except FileNotFoundError:
+            return 0, 0
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            uploads += 1
+            try:
+                size += sum(chunk.stat().st_size for chunk in os.scandir(entry.path))
+            except FileNotFoundError:
+                pass
+        return uploads, size
+
+    def store(self, index: int, chunk) -> None:
+        """Store a chunk, written under a temporary name first so that only complete chunks are ever counted."""
+        if not 0 <= index < self.chunk_count:
+            raise ChunkError('Neplatné poradie časti nahrávaného súboru')
+        if chunk.size != self._expected_size(index):
+            raise ChunkError('Nesprávna veľkosť časti nahrávaného súboru')
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._chunk_path(index)
+        with open(path + '.tmp', 'wb') as f:
+            for data in chunk.chunks():
+                f.write(data)
+        os.replace(path + '.tmp', path)
+
+    @property
+    def received(self) -> List[int]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[:-len(self.chunk_suffix)]) for name in names if name.endswith(self.chunk_suffix))
+
+    @property
+    def complete(self) -> bool:
+        return len(self.received) == self.chunk_count
+
+    @property
+    def claimed(self) -> bool:
+        return os.path.isdir(self.claimed_directory)
+
+    def claim(self) -> None:
+        """Move the complete chunks aside, where they are only read, unless a concurrent request already did."""
+        try:
+            os.rename(self.directory, self.claimed_directory)
+        except OSError:
+            return
+        # the retention period of claimed chunks starts now
+        os.utime(self.claimed_directory)
+
+    def assemble(self) -> io.BytesIO:
+        data = io.BytesIO()
+        for index in range(self.chunk_count):
+            with open(self._chunk_path(index, self.claimed_directory), 'rb') as f:
+                shutil.copyfileobj(f, data)
+        data.seek(0)
+        return data
+
+    def delete(self) -> None:
+        """Delete the chunks which are not claimed."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @classmethod
+    def delete_stale(cls, upload_dir: str, max_age: int, claimed_max_age: int) -> None:
+        """Delete unfinished uploads older than max_age seconds and claimed ones older than claimed_max_age."""
+        try:
+            entries = list(os.scandir(upload_dir))
+        except FileNotFoundError:
+            return
+        now = time.time()
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            entry_max_age = claimed_max_age if entry.name.endswith(cls.claimed_suffix) else max_age
+            if entry.stat().st_mtime < now - entry_max_age:
+                shutil.rmtree(entry.path, ignore_errors=True)
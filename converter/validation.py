@@ -0,0 +1,59 @@
+import os
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List
+
+from django.conf import settings
+from lxml import etree
+
+BUNDLED_SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema')
+
+
+@dataclass
+class ValidationResult:
+    errors: List[str] = field(default_factory=list)
+    duration_ms: float = 0.0
+    reduced_schema: bool = False
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+
+class PohodaValidator:
+    """Validates Pohoda XML against the Stormware XSDs in ``settings.POHODA_SCHEMA_DIR``.
+
+    The schema is compiled only once per process. The bundled XSDs are a hand-written subset covering what the
+    converter produces, the official ones can be used by pointing the setting to their directory.
+    """
+    schema_file = 'data.xsd'
+
+    @staticmethod
+    def reduced_schema() -> bool:
+        """Whether the bundled subset is used, which only checks the structure the converter itself produces."""
+        return os.path.abspath(settings.POHODA_SCHEMA_DIR) == BUNDLED_SCHEMA_DIR
+
+    @classmethod
+    def schema(cls) -> etree.XMLSchema:
+        return cls._compile(os.path.join(settings.POHODA_SCHEMA_DIR, cls.schema_file))
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _compile(path: str) -> etree.XMLSchema:
+        return etree.XMLSchema(etree.parse(path))
+
+    def validate(self, xml: str) -> ValidationResult:
+        schema = self.schema()
+        start = time.perf_counter()
+        try:
+            document = etree.fromstring(xml.encode('utf-8'))
+        except etree.XMLSyntaxError as e:
+            errors = [str(e)]
+        else:
+            if schema.validate(document):
+                errors = []
+            else:
+                errors = [f'Riadok {error.line}: {error.message}' for error in schema.error_log]
+        return ValidationResult(errors=errors, duration_ms=(time.perf_counter() - start) * 1000,
+                                reduced_schema=self.reduced_schema())
@@ -1,18 +1,33 @@
+import json
+import logging
+from dataclasses import asdict
+from typing import Iterator, List
+
+from django.conf import settings
 from django.core.files.uploadedfile import InMemoryUploadedFile
-from django.http import HttpResponse, HttpRequest, HttpResponseNotAllowed, HttpResponseBadRequest, JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpRequest, HttpResponseNotAllowed, HttpResponseBadRequest, JsonResponse, \
+    StreamingHttpResponse
 from django.shortcuts import render
 from django.template import loader
 
 from converter.aggregation import InvoiceAggregator
-from converter.export import PohodaExporter
+from converter.export import CachedPohodaExporter
+from converter.model import Invoice
 from converter.parser import KrosParser, FormatError
+from converter.uploads import ChunkedUpload, ChunkError, UploadCapacityError
+from converter.validation import PohodaValidator
+
+logger = logging.getLogger(__name__)
 
 
 def index(request: HttpRequest):
-    return render(request, 'index.html')
+    return render(request, 'index.html', {'reduced_schema': PohodaValidator.reduced_schema()})
 
 
 def convert(request: HttpRequest):
+    if request.method == 'GET' and 'dzuuid' in request.GET:
+        return _chunked_upload_status(request)
     if request.method != 'POST':
         return HttpResponseNotAllowed(['POST'])
     if 'file' not in request.FILES:
@@ -20,23 +35,140 @@ def convert(request: HttpRequest):
 
     file: InMemoryUploadedFile = request.FILES['file']
 
+    if 'dzuuid' in request.POST:
+        try:
+            upload = ChunkedUpload.from_params(settings.CHUNKED_UPLOAD_DIR, request.POST,
+                                               settings.CHUNKED_UPLOAD_MAX_SIZE)
+            index = ChunkedUpload.chunk_index(request.POST)
+            if index == 0:
+                _delete_stale_uploads()
+            # a final chunk re-sent after the response to it was cut off converts the claimed chunks again
+            if not upload.is_final(index) or not upload.claimed:
+                upload.check_capacity(settings.CHUNKED_UPLOAD_MAX_PENDING_SIZE, settings.CHUNKED_UPLOAD_MAX_PENDING)
+                upload.store(index, file)
+        except UploadCapacityError as e:
+            return HttpResponse(str(e), status=503)
+        except ChunkError as e:
+            return HttpResponseBadRequest(str(e))
+        if not upload.is_final(index):
+            return JsonResponse({'chunks_received': len(upload.received), 'chunks_total': upload.chunk_count})
+        if upload.complete:
+            upload.claim()
+        upload.delete()
+        if not upload.claimed:
+            return HttpResponseBadRequest('Chýbajú niektoré časti nahrávaného súboru, nahrajte ho znova')
+        file = upload.assemble()
+
+    stream = bool(request.POST.get('stream'))
     try:
-        invoice = KrosParser(file).parse()
+        parser = KrosParser(file)
+        invoice = parser.parse_header()
+        if not stream:
+            parser.parse_items(invoice)
     except FormatError as e:
         return HttpResponseBadRequest(str(e))
 
+    validate = bool(request.POST.get('validate'))
+    if stream:
+        response = StreamingHttpResponse(_stream_conversion(parser, invoice, validate),
+                                         content_type='application/x-ndjson')
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
     aggregator = InvoiceAggregator(invoice)
+    pohoda_xml = CachedPohodaExporter(invoice).export()
 
-    return JsonResponse({
+    response = {
         'invoice_number': invoice.number,
-        'table': loader.render_to_string('output.html', {
-            'invoice': invoice,
-            'aggregates': aggregator.aggregates,
-            'total': aggregator.total,
-        }),
-        'pohoda_xml': PohodaExporter(invoice).export(),
+        'table': _render_table(invoice, aggregator),
+        'pohoda_xml': pohoda_xml,
+        'unknown_codes': aggregator.unknown_codes,
+        'item_codes': _item_codes(invoice),
+    }
+    if validate:
+        response['validation'] = _validate(pohoda_xml)
+
+    return JsonResponse(response)
+
+
+def _chunked_upload_status(request: HttpRequest) -> HttpResponse:
+    """Indexes of the chunks already received, so that an interrupted upload only sends the missing ones."""
+    try:
+        upload = ChunkedUpload.from_params(settings.CHUNKED_UPLOAD_DIR, request.GET, settings.CHUNKED_UPLOAD_MAX_SIZE)
+    except ChunkError as e:
+        return HttpResponseBadRequest(str(e))
+    _delete_stale_uploads()
+    return JsonResponse({'received_chunks': upload.received, 'chunks_total': upload.chunk_count})
+
+
+def _delete_stale_uploads():
+    ChunkedUpload.delete_stale(settings.CHUNKED_UPLOAD_DIR, settings.CHUNKED_UPLOAD_MAX_AGE,
+                               settings.CHUNKED_UPLOAD_CLAIMED_MAX_AGE)
+
+
+def _render_table(invoice: Invoice, aggregator: InvoiceAggregator) -> str:
+    return loader.render_to_string('output.html', {
+        'invoice': invoice,
+        'aggregates': aggregator.aggregates,
+        'total': aggregator.total,
     })
 
 
+def _item_codes(invoice: Invoice) -> List[dict]:
+    """KN code annotation of the invoice items with a code, None as the description of codes not in the catalogue."""
+    return [{'name': item.name, 'code': item.code, 'kn_description': item.kn_description}
+            for item in invoice.items if item.code]
+
+
+def _validate(pohoda_xml: str) -> dict:
+    validation = PohodaValidator().validate(pohoda_xml)
+    return {
+        'valid': validation.valid,
+        'errors': validation.errors,
+        'duration_ms': round(validation.duration_ms, 3),
+        'reduced_schema': validation.reduced_schema,
+    }
+
+
+STREAM_XML_CHUNK_SIZE = 64 * 1024
+
+
+def _event(event: str, **fields) -> str:
+    return json.dumps({'event': event, **fields}, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _stream_conversion(parser: KrosParser, invoice: Invoice, validate: bool) -> Iterator[str]:
+    """Newline delimited JSON events: header, aggregate rows, table, Pohoda XML chunks, validation and end.
+
+    The header is already parsed, so it is sent before the items are read. Errors after the response has started
+    are reported as an error event, so the stream always ends with an error or end event.
+    """
+    header = asdict(invoice)
+    del header['items']
+    yield _event('header', invoice=header)
+
+    try:
+        parser.parse_items(invoice)
+        aggregator = InvoiceAggregator(invoice)
+        for aggregate in aggregator.aggregates:
+            yield _event('aggregate', **asdict(aggregate))
+        yield _event('table', table=_render_table(invoice, aggregator), total=aggregator.total,
+                     unknown_codes=aggregator.unknown_codes, item_codes=_item_codes(invoice))
+
+        pohoda_xml = CachedPohodaExporter(invoice).export()
+        for start in range(0, len(pohoda_xml), STREAM_XML_CHUNK_SIZE):
+            yield _event('pohoda_xml', chunk=pohoda_xml[start:start + STREAM_XML_CHUNK_SIZE])
+        if validate:
+            yield _event('validation', **_validate(pohoda_xml))
+    except ValueError as e:
+        yield _event('error', message=str(e))
+        return
+    except Exception:
+        logger.exception('Streamed conversion of invoice %s failed', invoice.number)
+        yield _event('error', message='Pri spracovaní faktúry nastala neočakávaná chyba')
+        return
+    yield _event('end', invoice_number=invoice.number)
+
+
 def health(request: HttpRequest):
     return HttpResponse('ok')
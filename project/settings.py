@@ -105,3 +105,27 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 INTERNAL_IPS = ['127.0.0.1']
+
+# Chunked uploads
+# Chunks are kept on local disk until the last one arrives, unfinished uploads are removed after a day. Complete
+# uploads are kept for a few minutes, so that a final chunk re-sent after a dropped connection converts them again.
+
+CHUNKED_UPLOAD_DIR = os.getenv('CHUNKED_UPLOAD_DIR', os.path.join(BASE_DIR, 'uploads'))
+
+CHUNKED_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+
+CHUNKED_UPLOAD_MAX_AGE = 24 * 60 * 60
+
+CHUNKED_UPLOAD_CLAIMED_MAX_AGE = 10 * 60
+
+# New uploads are refused while this many uploads or bytes are kept on disk
+
+CHUNKED_UPLOAD_MAX_PENDING = 50
+
+CHUNKED_UPLOAD_MAX_PENDING_SIZE = 500 * 1024 * 1024
+
+# Pohoda XML validation
+# The bundled schema only covers the subset of Pohoda XML produced by the converter, set the directory with the
+# official Stormware XSDs (https://www.stormware.cz/schema/version_2/) to validate against them instead
+
+POHODA_SCHEMA_DIR = os.getenv('POHODA_SCHEMA_DIR', os.path.join(BASE_DIR, 'converter', 'schema'))